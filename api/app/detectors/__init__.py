@@ -1,9 +1,22 @@
 from .yolo_onnx import YOLOOnnxDetector
-from .grounding_dino import GroundingDINODetector
+
+
+def __getattr__(name: str):
+    # groundingdino pulls in torch; only import it when it's actually used, so
+    # YOLO-only callers (app.vision, quantize_yolo, uint8_input) don't pay for it
+    if name == "GroundingDINODetector":
+        from .grounding_dino import GroundingDINODetector
+        return GroundingDINODetector
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_detector(name: str, **kwargs):
+    """
+    Cheap to call per task: model sessions are cached per process (and warmed
+    up on first load), so this only builds a light wrapper around them.
+    """
     if name == "yolo_onnx":
         return YOLOOnnxDetector(**kwargs)
     if name in ("groundingdino", "dino", "grounding_dino"):
+        from .grounding_dino import GroundingDINODetector
         return GroundingDINODetector()
     raise ValueError(f"Unknown detector: {name}")
@@ -0,0 +1,41 @@
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def nms(boxes, scores, iou_thres):
+    """
+    Greedy NMS compiled with numba.
+    boxes: Nx4 (x1,y1,x2,y2), scores: N
+    returns kept indices (int64), highest score first
+    """
+    n = boxes.shape[0]
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    suppressed = np.zeros(n, dtype=np.bool_)
+    keep = np.empty(n, dtype=np.int64)
+    k = 0
+
+    for _i in range(n):
+        i = order[_i]
+        if suppressed[i]:
+            continue
+        keep[k] = i
+        k += 1
+
+        ix1, iy1, ix2, iy2 = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+        area_i = areas[i]
+        for _j in range(_i + 1, n):
+            j = order[_j]
+            if suppressed[j]:
+                continue
+            w = min(ix2, boxes[j, 2]) - max(ix1, boxes[j, 0])
+            h = min(iy2, boxes[j, 3]) - max(iy1, boxes[j, 1])
+            if w <= 0 or h <= 0:
+                continue
+            inter = w * h
+            union = area_i + areas[j] - inter
+            if union > 0 and inter / union > iou_thres:
+                suppressed[j] = True
+
+    return keep[:k]
@@ -1,9 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
+
+from PIL import Image
 
 Detection = Dict[str, Any]  # {"label": str, "score": float, "bbox_xyxy": [x1,y1,x2,y2]}
+ImageInput = Union[str, Image.Image]  # file path, or an already-decoded PIL image
+
+def load_rgb(image: ImageInput) -> Image.Image:
+    """Open `image` if it's a path; either way return an RGB PIL image."""
+    im = image if isinstance(image, Image.Image) else Image.open(image)
+    # most uploads are already RGB JPEGs: convert() would only make a full copy
+    return im if im.mode == "RGB" else im.convert("RGB")
 
 class BaseDetector(ABC):
     @abstractmethod
-    def detect(self, image_path: str) -> List[Detection]:
+    def detect(self, image: ImageInput) -> List[Detection]:
         pass
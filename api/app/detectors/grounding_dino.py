@@ -1,8 +1,12 @@
 import os
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+import groundingdino.datasets.transforms as T
 from groundingdino.util.inference import load_model, load_image, predict
 
+from .base import ImageInput, load_rgb
+
 _MODEL = None
 _DEVICE = None
 
@@ -32,12 +36,31 @@ def _get_model():
     _DEVICE = device
     return _MODEL, _DEVICE
 
+def _load_image(image: ImageInput):
+    if isinstance(image, str):
+        return load_image(image)
+    # same transform as groundingdino's load_image, minus re-reading the file
+    transform = T.Compose(
+        [
+            T.RandomResize([800], max_size=1333),
+            T.ToTensor(),
+            T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+        ]
+    )
+    image_source = load_rgb(image)
+    image_transformed, _ = transform(image_source, None)
+    return np.asarray(image_source), image_transformed
+
 class GroundingDINODetector:
     name = "groundingdino"
 
+    def warm_up(self) -> None:
+        """Load the model now (worker startup) rather than on the first detect."""
+        _get_model()
+
     def detect(
         self,
-        image_path: str,
+        image: ImageInput,
         prompt: Optional[str] = None,
         box_threshold: Optional[float] = None,
         text_threshold: Optional[float] = None,
@@ -51,11 +74,11 @@ class GroundingDINODetector:
         box_threshold = float(box_threshold) if box_threshold is not None else float(os.getenv("GROUNDINGDINO_BOX_THRESHOLD", "0.35"))
         text_threshold = float(text_threshold) if text_threshold is not None else float(os.getenv("GROUNDINGDINO_TEXT_THRESHOLD", "0.25"))
 
-        image_source, image = load_image(image_path)
+        image_source, image_tensor = _load_image(image)
 
         boxes, logits, phrases = predict(
             model=model,
-            image=image,
+            image=image_tensor,
             caption=prompt,
             box_threshold=box_threshold,
             text_threshold=text_threshold,
@@ -63,20 +86,17 @@ class GroundingDINODetector:
         )
 
         h, w = image_source.shape[:2]
-        detections: List[Dict[str, Any]] = []
-
-        # boxes from helper are normalized cxcywh -> convert to pixel xyxy
-        for box, logit, phrase in zip(boxes, logits, phrases):
-            cx, cy, bw, bh = box.tolist()
-            x1 = (cx - bw / 2.0) * w
-            y1 = (cy - bh / 2.0) * h
-            x2 = (cx + bw / 2.0) * w
-            y2 = (cy + bh / 2.0) * h
-
-            detections.append({
-                "label": str(phrase).strip(),
-                "confidence": float(logit),
-                "bbox_xyxy": [float(x1), float(y1), float(x2), float(y2)],
-            })
 
+        # boxes from helper are normalized cxcywh -> convert to pixel xyxy,
+        # all rows at once; predict() hands back CPU tensors, so no copy via python
+        cxcywh = boxes.double().numpy().reshape(-1, 4)
+        xyxy = np.empty_like(cxcywh)
+        xyxy[:, :2] = cxcywh[:, :2] - cxcywh[:, 2:] / 2.0
+        xyxy[:, 2:] = cxcywh[:, :2] + cxcywh[:, 2:] / 2.0
+        xyxy *= (w, h, w, h)
+
+        detections: List[Dict[str, Any]] = [
+            {"label": str(phrase).strip(), "confidence": conf, "bbox_xyxy": box}
+            for box, conf, phrase in zip(xyxy.tolist(), logits.tolist(), phrases)
+        ]
         return detections
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Optional shared-memory inference server for the Celery worker.
+
+With YOLO_INFER_SERVER=1 the worker's main process forks one server process
+at startup (worker_init, before the prefork pool exists) that holds the only
+YOLO ONNX session. Pool processes letterbox straight into a shared-memory
+input slot, pass the slot id over a queue and postprocess from the matching
+output slot, so the host runs one model copy and one ORT thread pool instead
+of one per pool process. Requests that arrive within YOLO_INFER_BATCH_MS of
+each other share one run when the model has a dynamic batch axis.
+"""
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# set by start() in the worker's main process; pool processes inherit it on fork
+_STATE: Optional[Dict[str, Any]] = None
+_CLIENT: Optional["InferClient"] = None
+
+
+def _attach(name: str) -> SharedMemory:
+    shm = SharedMemory(name=name)
+    # attaching registers the segment with this process's resource tracker,
+    # which would unlink it when the process exits; the server owns it
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _serve(model_path: str, input_size: int, n_slots: int, requests, free, responses, ready):
+    # the only session on the host: give it every core
+    os.environ["ORT_INTRA"] = os.getenv("YOLO_INFER_THREADS", str(os.cpu_count() or 1))
+    from .yolo_onnx import UINT8_INPUT, _get_session
+
+    try:
+        sess = _get_session(model_path)
+        inp, out = sess.get_inputs()[0], sess.get_outputs()[0]
+        if inp.type == UINT8_INPUT:
+            in_shape, in_dtype = (1, input_size, input_size, 3), np.dtype(np.uint8)
+        else:
+            in_shape, in_dtype = (1, 3, input_size, input_size), np.dtype(np.float32)
+        if out.type != "tensor(float)":
+            raise RuntimeError(f"need a float output, got {out.type}")
+        # dynamic exports leave non-batch dims symbolic (['batch', 84, 'anchors']);
+        # the shape a run at input_size actually produces is what the slots need
+        probe = sess.run([out.name], {inp.name: np.zeros(in_shape, in_dtype)})[0]
+        out_shape = (1,) + tuple(probe.shape[1:])
+    except Exception as e:
+        ready.put({"error": repr(e)})
+        return
+
+    in_shm = [SharedMemory(create=True, size=int(np.prod(in_shape)) * in_dtype.itemsize) for _ in range(n_slots)]
+    out_shm = [SharedMemory(create=True, size=int(np.prod(out_shape)) * 4) for _ in range(n_slots)]
+    ins = [np.ndarray(in_shape, in_dtype, buffer=s.buf) for s in in_shm]
+    outs = [np.ndarray(out_shape, np.float32, buffer=s.buf) for s in out_shm]
+    dynamic_batch = not isinstance(inp.shape[0], int)
+    window = float(os.getenv("YOLO_INFER_BATCH_MS", "10")) / 1000.0
+
+    ready.put({
+        "in_shape": in_shape, "in_dtype": in_dtype.str, "out_shape": out_shape,
+        "in_shm": [s.name for s in in_shm], "out_shm": [s.name for s in out_shm],
+    })
+    for i in range(n_slots):
+        free.put(i)
+
+    try:
+        stop = False
+        while not stop:
+            slot = requests.get()
+            if slot is None:
+                break
+            batch = [slot]
+            if dynamic_batch:
+                # whatever else arrives inside the window rides along in the same run
+                deadline = time.monotonic() + window
+                while len(batch) < n_slots:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        slot = requests.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if slot is None:
+                        stop = True
+                        break
+                    batch.append(slot)
+            _run(sess, inp.name, ins, outs, batch, responses)
+    finally:
+        for s in in_shm + out_shm:
+            s.close()
+            s.unlink()
+
+
+def _run(sess, in_name: str, ins: List[np.ndarray], outs: List[np.ndarray], batch: List[int], responses):
+    err = None
+    try:
+        if len(batch) == 1:
+            outs[batch[0]][...] = sess.run(None, {in_name: ins[batch[0]]})[0]
+        else:
+            y = sess.run(None, {in_name: np.concatenate([ins[s] for s in batch])})[0]
+            for k, s in enumerate(batch):
+                outs[s][...] = y[k:k + 1]
+    except Exception as e:
+        log.exception("inference server run failed")
+        err = repr(e)
+    for s in batch:
+        responses[s].put(err)
+
+
+class InferClient:
+    """Pool-process side: borrow a slot, fill its input, run, read its output."""
+
+    def __init__(self, state: Dict[str, Any]):
+        spec = state["spec"]
+        self._requests, self._free, self._responses = state["requests"], state["free"], state["responses"]
+        self._timeout = float(os.getenv("YOLO_INFER_TIMEOUT", "60"))
+        n_in = len(spec["in_shm"])
+        self._shm = [_attach(n) for n in spec["in_shm"] + spec["out_shm"]]  # keep the mappings alive
+        in_dtype = np.dtype(spec["in_dtype"])
+        self._ins = [np.ndarray(spec["in_shape"], in_dtype, buffer=s.buf) for s in self._shm[:n_in]]
+        self._outs = [np.ndarray(spec["out_shape"], np.float32, buffer=s.buf) for s in self._shm[n_in:]]
+        self._lost = set()
+
+    @contextmanager
+    def slot(self):
+        """
+        Yields (input, run): write the model input into `input`, then run()
+        returns the output array. Both live in shared memory and are only valid
+        inside the with-block.
+        """
+        slot = self._free.get(timeout=self._timeout)
+        try:
+            yield self._ins[slot], lambda: self._run(slot)
+        finally:
+            if slot not in self._lost:
+                self._free.put(slot)
+
+    def _run(self, slot: int) -> np.ndarray:
+        self._requests.put(slot)
+        try:
+            err = self._responses[slot].get(timeout=self._timeout)
+        except queue.Empty:
+            # the server may still write this slot later: never hand it out again
+            self._lost.add(slot)
+            raise TimeoutError(f"inference server did not answer within {self._timeout:.0f}s")
+        if err is not None:
+            raise RuntimeError(f"inference server: {err}")
+        return self._outs[slot]
+
+
+def start(model_path: Optional[str] = None, input_size: int = 640, n_slots: Optional[int] = None):
+    """Fork the server; call in the worker's main process before the pool forks."""
+    global _STATE
+    model_path = model_path or os.getenv("YOLO_ONNX", "/app/models/yolov8n.onnx")
+    n_slots = n_slots or int(os.getenv("YOLO_INFER_SLOTS", "0")) or 2 * int(os.getenv("CELERY_CONC", "2"))
+
+    ctx = mp.get_context("fork")  # modules are already imported here; no re-import like spawn
+    requests, free, ready = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    responses = [ctx.Queue() for _ in range(n_slots)]
+    proc = ctx.Process(
+        target=_serve, args=(model_path, input_size, n_slots, requests, free, responses, ready),
+        name="yolo-infer-server", daemon=True,
+    )
+    proc.start()
+    spec = ready.get(timeout=600)
+    if "error" in spec:
+        proc.join()
+        raise RuntimeError(f"inference server failed to start: {spec['error']}")
+
+    _STATE = {
+        "model_path": model_path, "input_size": input_size, "proc": proc,
+        "requests": requests, "free": free, "responses": responses, "spec": spec,
+    }
+    log.info("inference server pid=%s serving %s with %d slots", proc.pid, model_path, n_slots)
+
+
+def stop():
+    if _STATE is not None and _STATE["proc"].is_alive():
+        _STATE["requests"].put(None)
+        _STATE["proc"].join(timeout=10)
+
+
+def client(model_path: str, input_size: int) -> Optional[InferClient]:
+    """This process's client if a server was started for this model, else None."""
+    global _CLIENT
+    if _STATE is None or (_STATE["model_path"], _STATE["input_size"]) != (model_path, input_size):
+        return None
+    if _CLIENT is None:
+        _CLIENT = InferClient(_STATE)
+    return _CLIENT
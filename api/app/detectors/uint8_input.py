@@ -0,0 +1,76 @@
+"""
+One-time patch that makes the YOLO ONNX model take raw uint8 NHWC input.
+
+    python -m app.detectors.uint8_input --model /app/models/yolov8n.onnx
+
+Writes <model>.u8.onnx: the old float32 NCHW input is fed by
+Transpose(NHWC->NCHW) -> Cast(float) -> Mul(1/255) nodes inside the graph, so
+the detector letterboxes straight into the bound uint8 input and ORT does the
+normalization in its own kernels. The transpose runs on uint8, a quarter of
+the bytes of the float tensor. Point YOLO_ONNX at the result; quantize_yolo
+works on it as well (and writes <model>.u8.int8.onnx).
+"""
+import argparse
+import os
+from typing import Optional
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+
+def uint8_model_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".u8.onnx"
+
+
+def patch(model_path: str, out_path: Optional[str] = None) -> str:
+    out_path = out_path or uint8_model_path(model_path)
+    model = onnx.load(model_path)
+    graph = model.graph
+
+    old = graph.input[0]
+    if old.type.tensor_type.elem_type != TensorProto.FLOAT:
+        raise RuntimeError(f"{model_path}: input {old.name} is not float32, already patched?")
+    dims = old.type.tensor_type.shape.dim
+    if len(dims) != 4 or dims[1].dim_value != 3:
+        raise RuntimeError(f"{model_path}: expected an Nx3xHxW input, got {dims}")
+
+    # symbolic dims stay symbolic (dynamic=True exports make batch, H and W
+    # dynamic); only the channel axis is always a concrete 3
+    batch, h, w = (d.dim_param or d.dim_value for d in (dims[0], dims[2], dims[3]))
+    name = old.name
+    new_name = f"{name}_u8"
+    new_input = helper.make_tensor_value_info(new_name, TensorProto.UINT8, [batch, h, w, 3])
+
+    # the old input name becomes the output of the prepended nodes, so
+    # nothing downstream needs rewiring
+    scale = numpy_helper.from_array(np.array(1.0 / 255.0, dtype=np.float32), f"{name}_inv255")
+    nodes = [
+        helper.make_node("Transpose", [new_name], [f"{name}_nchw_u8"], perm=[0, 3, 1, 2]),
+        helper.make_node("Cast", [f"{name}_nchw_u8"], [f"{name}_nchw_f32"], to=TensorProto.FLOAT),
+        helper.make_node("Mul", [f"{name}_nchw_f32", scale.name], [name]),
+    ]
+
+    graph.input.remove(old)
+    graph.input.insert(0, new_input)
+    graph.initializer.append(scale)
+    for i, node in enumerate(nodes):
+        graph.node.insert(i, node)
+
+    onnx.checker.check_model(model)
+    onnx.save(model, out_path)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Give the YOLO ONNX model a uint8 NHWC input.")
+    parser.add_argument("--model", default=os.getenv("YOLO_ONNX", "/app/models/yolov8n.onnx"))
+    parser.add_argument("--out", default=None, help="defaults to <model>.u8.onnx")
+    args = parser.parse_args()
+
+    out = patch(args.model, args.out)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,23 @@
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import onnxruntime as ort
 from PIL import Image
-from functools import lru_cache
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import infer_server
+from .base import ImageInput, load_rgb
+
+try:
+    from ._nms_numba import nms as nms_kernel
+except ImportError:  # numba not installed: use OpenCV's C++ NMS instead
+    nms_kernel = None
+    import cv2
 
 # Keep COCO_NAMES here (or import from a constants module)
-COCO_NAMES = [
+COCO_NAMES = (
   "person","bicycle","car","motorcycle","airplane","bus","train","truck","boat","traffic light",
   "fire hydrant","stop sign","parking meter","bench","bird","cat","dog","horse","sheep","cow",
   "elephant","bear","zebra","giraffe","backpack","umbrella","handbag","tie","suitcase","frisbee",
@@ -15,28 +26,255 @@ COCO_NAMES = [
   "broccoli","carrot","hot dog","pizza","donut","cake","chair","couch","potted plant","bed",
   "dining table","toilet","tv","laptop","mouse","remote","keyboard","cell phone","microwave","oven",
   "toaster","sink","refrigerator","book","clock","vase","scissors","teddy bear","hair drier","toothbrush"
-]
+)
 
 
 Detection = Dict[str, Any]
 
-@lru_cache(maxsize=8)
+log = logging.getLogger(__name__)
+
+_INV_255 = np.float32(1.0 / 255.0)
+# (boxes, conf, cls) for a frame with nothing above threshold
+_NO_BOXES = (np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.int64))
+# input type of models patched by uint8_input.py (NHWC uint8, normalized in-graph)
+UINT8_INPUT = "tensor(uint8)"
+
+
+def int8_model_path(model_path: str) -> str:
+    """Where quantize_yolo writes the INT8 variant of `model_path`."""
+    return os.path.splitext(model_path)[0] + ".int8.onnx"
+
+
+def _cpu_has_vnni() -> Optional[bool]:
+    """True/False from /proc/cpuinfo flags; None if they can't be read."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = next((line for line in f if line.startswith("flags")), "").split()
+    except OSError:
+        return None
+    return "avx512_vnni" in flags or "avx_vnni" in flags
+
+
+def _optimized_model_path(model_path: str) -> str:
+    """
+    Cache file for the ORT-optimized graph. /app/models is mounted read-only, so
+    this lives under YOLO_ORT_CACHE_DIR; mtime+size in the name invalidates it
+    when the source model is replaced.
+    """
+    st = os.stat(model_path)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    cache_dir = os.getenv("YOLO_ORT_CACHE_DIR", "/tmp/ort_cache")
+    return os.path.join(cache_dir, f"{stem}.{int(st.st_mtime)}.{st.st_size}.opt.onnx")
+
+
+def _intra_op_threads() -> int:
+    """
+    ORT_INTRA if set; otherwise split the cores between the CELERY_CONC worker
+    processes so N workers x N ORT threads don't oversubscribe the CPU.
+    """
+    if os.getenv("ORT_INTRA"):
+        return max(1, int(os.environ["ORT_INTRA"]))
+    workers = max(1, int(os.getenv("CELERY_CONC", "2")))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _session_options() -> ort.SessionOptions:
+    so = ort.SessionOptions()
+    so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    so.intra_op_num_threads = _intra_op_threads()
+    so.inter_op_num_threads = 1  # sequential graph: no inter-op parallelism to use
+    so.enable_mem_pattern = True  # fixed input shape -> replay one allocation plan
+    # the arena keeps peak memory around between runs; ORT_CPU_ARENA=0 trades
+    # some speed for a smaller footprint on memory-tight hosts
+    so.enable_cpu_mem_arena = os.getenv("ORT_CPU_ARENA", "1") != "0"
+    # idle ORT threads busy-wait by default, burning cores the other pool
+    # processes need; ORT_SPIN=1 brings it back for a single-process setup
+    if os.getenv("ORT_SPIN", "0") != "1":
+        so.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return so
+
+
+_EP_NAMES = {
+    "openvino": "OpenVINOExecutionProvider",
+    "dnnl": "DnnlExecutionProvider",
+    "cpu": "CPUExecutionProvider",
+}
+
+
+def _providers() -> list:
+    """
+    Execution providers in priority order, CPU always last as the fallback.
+    YOLO_ORT_EP=auto (default) takes whichever of OpenVINO / oneDNN this
+    onnxruntime build ships (the stock wheel only has CPU); openvino|dnnl|cpu
+    pins one.
+    """
+    want = os.getenv("YOLO_ORT_EP", "auto").lower()
+    names = ["openvino", "dnnl"] if want == "auto" else [want]
+    avail = ort.get_available_providers()
+    providers: list = []
+    for n in names:
+        ep = _EP_NAMES.get(n)
+        if ep is None:
+            raise ValueError(f"Unknown YOLO_ORT_EP: {want}")
+        if ep == "CPUExecutionProvider":
+            continue
+        if ep not in avail:
+            if want != "auto":
+                log.warning("YOLO_ORT_EP=%s but %s is not in this onnxruntime build; using CPU", want, ep)
+            continue
+        providers.append((ep, {"device_type": "CPU"}) if ep == "OpenVINOExecutionProvider" else ep)
+    return providers + ["CPUExecutionProvider"]
+
+
+# (model_path, intra-op threads) -> session, built once per worker process
+_SESS_CACHE: Dict[Tuple[str, int], ort.InferenceSession] = {}
+_SESS_LOCK = threading.Lock()
+
+
 def _get_session(model_path: str) -> ort.InferenceSession:
+    # plain dict get on the hot path (get_detector runs per task); the lock
+    # only serializes the first build so two threads don't load it twice
+    key = (model_path, _intra_op_threads())
+    sess = _SESS_CACHE.get(key)
+    if sess is None:
+        with _SESS_LOCK:
+            sess = _SESS_CACHE.get(key)
+            if sess is None:
+                sess = _SESS_CACHE[key] = _build_session(model_path)
+    return sess
+
+
+def _build_session(model_path: str) -> ort.InferenceSession:
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"ONNX model not found at {model_path}")
 
-    # CPU-only providers
-    sess = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    # prefer the pre-quantized INT8 model (see quantize_yolo.py) when it exists;
+    # YOLO_INT8=0 forces FP32
+    int8_path = os.getenv("YOLO_ONNX_INT8") or int8_model_path(model_path)
+    if os.getenv("YOLO_INT8", "1") != "0" and os.path.exists(int8_path):
+        if _cpu_has_vnni() is False:
+            log.warning("Loading INT8 model %s but this CPU has no AVX512-VNNI/AVX-VNNI; "
+                        "int8 conv may be slower than FP32 here (YOLO_INT8=0 to disable)", int8_path)
+        model_path = int8_path
 
+    providers = _providers()
+    if providers != ["CPUExecutionProvider"]:
+        # OpenVINO / oneDNN partition and compile the graph themselves; the
+        # serialized cache below is CPU-EP specific (NCHWc nodes)
+        so = _session_options()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        sess = ort.InferenceSession(model_path, sess_options=so, providers=providers)
+        return _check_and_warm_up(sess)
+
+    sess = None
+    opt_path = _optimized_model_path(model_path)
+    if os.path.exists(opt_path):
+        # graph was already optimized + serialized by an earlier load; skip the rewrites
+        so = _session_options()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            sess = ort.InferenceSession(opt_path, sess_options=so, providers=["CPUExecutionProvider"])
+        except Exception:
+            sess = None  # truncated/stale cache file: rebuild below
+    if sess is None:
+        so = _session_options()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL  # incl. NCHWc layout
+        os.makedirs(os.path.dirname(opt_path), exist_ok=True)
+        so.optimized_model_filepath = opt_path
+        sess = ort.InferenceSession(model_path, sess_options=so, providers=["CPUExecutionProvider"])
+    return _check_and_warm_up(sess)
+
+
+def _check_and_warm_up(sess: ort.InferenceSession) -> ort.InferenceSession:
     # optional sanity check (one-time per model_path)
     inp = sess.get_inputs()[0]
     out = sess.get_outputs()[0]
     if inp.shape and len(inp.shape) != 4:
         raise RuntimeError(f"Unexpected input shape: {inp.shape}")
     # (don’t over-check output since ONNX exports vary)
+
+    # warm up: the first run does kernel selection + arena allocation (can be
+    # 0.5-2 s), so pay it at load time rather than on the first request
+    shape = [d if isinstance(d, int) else (1 if i == 0 else 640) for i, d in enumerate(inp.shape)]
+    dtype = np.uint8 if inp.type == UINT8_INPUT else np.float32
+    try:
+        sess.run(None, {inp.name: np.zeros(shape, dtype=dtype)})
+    except Exception:
+        pass  # odd export; the first real detect() just pays the cost instead
     return sess
 
 
+# per-thread _ThreadBuffers, see YOLOOnnxDetector._buffers
+_TLS = threading.local()
+
+
+class _ThreadBuffers:
+    """
+    One thread's letterbox canvas, model input tensor and IoBinding.
+
+    ORT reads input_buf through the bound OrtValue and, for static output
+    shapes, writes straight into output_buf, so a run copies nothing. The
+    binding is stateful, so each thread gets its own set. For uint8 NHWC
+    models the canvas *is* the input tensor.
+    """
+
+    def __init__(self, sess: ort.InferenceSession, in_name: str, out_name: str, input_size: int):
+        if sess.get_inputs()[0].type == UINT8_INPUT:
+            self.input_buf = np.full((1, input_size, input_size, 3), 114, dtype=np.uint8)
+            self.canvas = self.input_buf[0]
+        else:
+            self.canvas = np.full((input_size, input_size, 3), 114, dtype=np.uint8)
+            self.input_buf = np.empty((1, 3, input_size, input_size), dtype=np.float32)
+        self._batch_buf: Optional[np.ndarray] = None  # see batch_input()
+        self._in_name, self._out_name = in_name, out_name
+
+        self.io = sess.io_binding()
+        self.in_ort = ort.OrtValue.ortvalue_from_numpy(self.input_buf)
+        self.io.bind_ortvalue_input(in_name, self.in_ort)
+
+        out = sess.get_outputs()[0]
+        if out.type == "tensor(float)" and all(isinstance(d, int) for d in out.shape):
+            self.output_buf = np.empty(out.shape, dtype=np.float32)
+            self.io.bind_output(out_name, "cpu", 0, np.float32, self.output_buf.shape, self.output_buf.ctypes.data)
+        else:
+            self.output_buf = None  # dynamic dims: let ORT allocate per run
+            self.io.bind_output(out_name, "cpu")
+
+        # batched runs: input is rebound per call (batch size / buffer may change)
+        self.batch_io = sess.io_binding()
+
+    def batch_input(self, n: int) -> np.ndarray:
+        """Contiguous (n,...) staging buffer shaped like input_buf, grown on demand and reused."""
+        if self._batch_buf is None or self._batch_buf.shape[0] < n:
+            self._batch_buf = np.empty((n,) + self.input_buf.shape[1:], dtype=self.input_buf.dtype)
+        return self._batch_buf[:n]
+
+    def run(self, sess: ort.InferenceSession) -> np.ndarray:
+        sess.run_with_iobinding(self.io)
+        if self.output_buf is not None:
+            return self.output_buf
+        return self.io.copy_outputs_to_cpu()[0]
+
+    def run_batch(self, sess: ort.InferenceSession, x: np.ndarray) -> np.ndarray:
+        """Run on a batch_input() buffer; ORT reads it in place instead of copying it in."""
+        self.batch_io.bind_input(self._in_name, "cpu", 0, x.dtype, x.shape, x.ctypes.data)
+        self.batch_io.bind_output(self._out_name, "cpu")
+        sess.run_with_iobinding(self.batch_io)
+        return self.batch_io.copy_outputs_to_cpu()[0]
+
+
+_PREPROCESS_POOL: Optional[ThreadPoolExecutor] = None
+
+def _preprocess_pool() -> ThreadPoolExecutor:
+    global _PREPROCESS_POOL
+    if _PREPROCESS_POOL is None:
+        # same per-process share of the cores as the ORT session (CELERY_CONC)
+        _PREPROCESS_POOL = ThreadPoolExecutor(
+            max_workers=_intra_op_threads(), thread_name_prefix="yolo-preprocess"
+        )
+    return _PREPROCESS_POOL
+
+
 class YOLOOnnxDetector:
     def __init__(
         self,
@@ -44,6 +282,7 @@ class YOLOOnnxDetector:
         conf: Optional[float] = None,
         iou: Optional[float] = None,
         input_size: int = 640,
+        class_ids: Optional[Iterable[int]] = None,
     ):
         # Defaults: args override env; env override fallback
         self.model_path = model_path or os.getenv("YOLO_ONNX", "/app/models/yolov8n.onnx")
@@ -51,86 +290,160 @@ class YOLOOnnxDetector:
         self.iou = float(iou if iou is not None else os.getenv("YOLO_IOU", "0.45"))
         self.input_size = int(input_size)
 
-        # create/load once (cached across instances)
-        self.sess = _get_session(self.model_path)
-        self.in_name = self.sess.get_inputs()[0].name
+        # optional class allow-list, e.g. YOLO_CLASSES=0,2,5 (None = keep all classes)
+        if class_ids is None:
+            raw = os.getenv("YOLO_CLASSES", "")
+            class_ids = [int(x) for x in raw.split(",") if x.strip()] or None
+        self.class_ids = frozenset(class_ids) if class_ids is not None else None
+        self._class_id_arr = np.fromiter(sorted(self.class_ids), np.int64) if self.class_ids else None
+
+        # with YOLO_INFER_SERVER=1 the session lives in the worker's inference
+        # server process (infer_server.py); this process only pre/postprocesses
+        self._remote = infer_server.client(self.model_path, self.input_size)
+        if self._remote is not None:
+            self.sess = None
+            self._static_batch = True  # the server batches across processes instead
+        else:
+            # create/load once (cached across instances)
+            self.sess = _get_session(self.model_path)
+            inp = self.sess.get_inputs()[0]
+            self.in_name = inp.name
+            self.out_name = self.sess.get_outputs()[0].name
+            self._static_batch = isinstance(inp.shape[0], int)
+
+    def _buffers(self) -> "_ThreadBuffers":
+        # keyed like the session cache, so detectors built per task reuse them
+        cache = _TLS.__dict__.setdefault("bufs", {})
+        key = (self.model_path, self.input_size)
+        bufs = cache.get(key)
+        if bufs is None:
+            bufs = cache[key] = _ThreadBuffers(self.sess, self.in_name, self.out_name, self.input_size)
+        return bufs
+
+    def _canvas(self) -> np.ndarray:
+        # bare letterbox scratch (server runs, detect_batch pool threads), no
+        # input tensor or IoBinding like _ThreadBuffers
+        cache = _TLS.__dict__.setdefault("canvas", {})
+        canvas = cache.get(self.input_size)
+        if canvas is None:
+            canvas = cache[self.input_size] = np.full((self.input_size, self.input_size, 3), 114, np.uint8)
+        return canvas
 
     # ---- keep your helpers basically the same ----
-    def _letterbox(self, im: Image.Image, new_shape: int):
-        w, h = im.size
+    def _load(self, image: ImageInput):
+        """
+        RGB image plus its full-resolution size. JPEG paths are decoded with
+        libjpeg's DCT scaling (PIL draft) at the largest 1/2..1/8 step that still
+        covers the model input, so the full-size pixels are never produced.
+        """
+        if isinstance(image, Image.Image):
+            return load_rgb(image), image.size
+        im = Image.open(image)
+        w, h = size = im.size
+        # draft to the letterboxed size, not the square: draft keeps both sides
+        # >= the request, so a square would pin the short side to input_size
+        scale = self.input_size / max(w, h)
+        im.draft("RGB", (int(w * scale), int(h * scale)))  # no-op for non-JPEG
+        return load_rgb(im), size
+
+    def _letterbox(self, im: Image.Image, new_shape: int, canvas: np.ndarray, orig_size=None):
+        # orig_size: full-res size when `im` was draft-decoded smaller
+        w, h = orig_size or im.size
         scale = new_shape / max(w, h)
         nw, nh = int(w * scale), int(h * scale)
-        im_resized = im.resize((nw, nh))
-        canvas = Image.new("RGB", (new_shape, new_shape), (114, 114, 114))
+        if (nw, nh) != im.size:
+            # reducing_gap lets PIL do a cheap integer box-reduce first on big photos
+            im = im.resize((nw, nh), Image.Resampling.BILINEAR, reducing_gap=3.0)
         pad_x = (new_shape - nw) // 2
         pad_y = (new_shape - nh) // 2
-        canvas.paste(im_resized, (pad_x, pad_y))
+
+        canvas.fill(114)
+        canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = np.asarray(im)
         return canvas, scale, pad_x, pad_y, w, h
 
     def _nms(self, boxes, scores, iou_thres):
-        idxs = scores.argsort()[::-1]
-        keep = []
-        while idxs.size > 0:
-            i = idxs[0]
-            keep.append(i)
-            if idxs.size == 1:
-                break
-            rest = idxs[1:]
-            xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
-            yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
-            xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
-            yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
-            inter = np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
-            area_i = (boxes[i, 2] - boxes[i, 0]) * (boxes[i, 3] - boxes[i, 1])
-            area_r = (boxes[rest, 2] - boxes[rest, 0]) * (boxes[rest, 3] - boxes[rest, 1])
-            union = area_i + area_r - inter + 1e-6
-            iou = inter / union
-            idxs = rest[iou <= iou_thres]
-        return keep
-
-    def detect(self, image_path: str) -> List[Detection]:
-        im = Image.open(image_path).convert("RGB")
-        im_lb, scale, pad_x, pad_y, orig_w, orig_h = self._letterbox(im, self.input_size)
-
-        x = np.asarray(im_lb).astype(np.float32) / 255.0
-        x = np.transpose(x, (2, 0, 1))[None, ...]  # 1x3xSxS
-
-        outputs = self.sess.run(None, {self.in_name: x})
-        pred = np.squeeze(outputs[0])
+        if nms_kernel is not None:
+            # numba kernel (see _nms_numba.py); first call JITs, cache=True persists it
+            return nms_kernel(np.ascontiguousarray(boxes), np.ascontiguousarray(scores), float(iou_thres))
 
-        # Handle common YOLOv8 ONNX layouts
-        if pred.ndim == 2 and pred.shape[0] in (84, 85):
-            pred = pred.T
-        elif pred.ndim == 3:
-            pred = np.squeeze(pred)
-            if pred.shape[0] in (84, 85):
-                pred = pred.T
+        # cv2.dnn.NMSBoxes wants xywh; scores were already thresholded by the caller
+        xywh = boxes.copy()
+        xywh[:, 2:] -= boxes[:, :2]
+        keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, float(iou_thres))
+        return np.asarray(keep, dtype=np.int64).reshape(-1)
 
-        xywh = pred[:, 0:4]
-        cls_scores = pred[:, 4:]  # 80
+    def _preprocess(self, im: Image.Image, canvas: np.ndarray, out: np.ndarray, orig_size=None):
+        """Letterbox `im` into `out` (3xSxS float32 or SxSx3 uint8); returns the de-letterbox params."""
+        if out.dtype == np.uint8:
+            canvas = out  # uint8 NHWC model: cast/scale/transpose happen inside the graph
+        im_lb, scale, pad_x, pad_y, orig_w, orig_h = self._letterbox(im, self.input_size, canvas, orig_size)
 
-        cls_id = np.argmax(cls_scores, axis=1)
-        cls_conf = cls_scores[np.arange(cls_scores.shape[0]), cls_id]
+        if im_lb is not out:
+            # uint8 HWC -> float32 CHW /255 in a single pass, straight into the model input
+            np.multiply(im_lb.transpose(2, 0, 1), _INV_255, out=out)
+        return scale, pad_x, pad_y, orig_w, orig_h
 
-        mask = cls_conf >= self.conf
-        xywh = xywh[mask]
-        cls_id = cls_id[mask]
-        cls_conf = cls_conf[mask]
+    def warm_up(self) -> None:
+        """
+        One dummy detect (per-thread buffers, IoBinding) and an NMS call per box
+        dtype the decoder produces, so the numba kernel is compiled or loaded
+        from its cache before the first real image.
+        """
+        self.detect(Image.new("RGB", (self.input_size, self.input_size), (114, 114, 114)))
+        scores = np.ones(2, dtype=np.float32)
+        for dtype in (np.float32, np.float64):
+            self._nms(np.array([[0, 0, 1, 1], [0, 0, 1, 1]], dtype=dtype), scores, self.iou)
 
-        if xywh.shape[0] == 0:
-            return []
+    def detect(self, image: ImageInput) -> List[Detection]:
+        im, size = self._load(image)
+        if self._remote is not None:
+            # letterbox straight into the shared-memory slot; the output is
+            # postprocessed (copied out) before the slot is handed back
+            with self._remote.slot() as (x, run):
+                meta = self._preprocess(im, self._canvas(), x[0], size)
+                return self._postprocess(run(), *meta)
+
+        bufs = self._buffers()
+        meta = self._preprocess(im, bufs.canvas, bufs.input_buf[0], size)
+        return self._postprocess(bufs.run(self.sess), *meta)
+
+    def detect_batch(self, images: List[ImageInput]) -> List[List[Detection]]:
+        """
+        Detect on several images with one session run. Needs a model
+        exported with a dynamic batch axis (`yolo export ... dynamic=True`);
+        fixed batch-1 exports fall back to one run per image.
+        Returns one detection list per input, in input order.
+        """
+        if len(images) <= 1 or self._static_batch:
+            return [self.detect(im) for im in images]
 
-        x_c, y_c, w, h = xywh[:, 0], xywh[:, 1], xywh[:, 2], xywh[:, 3]
-        x1 = x_c - w / 2
-        y1 = y_c - h / 2
-        x2 = x_c + w / 2
-        y2 = y_c + h / 2
-        boxes = np.stack([x1, y1, x2, y2], axis=1)
+        bufs = self._buffers()
+        x = bufs.batch_input(len(images))
 
-        keep = self._nms(boxes, cls_conf, self.iou)
-        boxes = boxes[keep]
-        cls_id = cls_id[keep]
-        cls_conf = cls_conf[keep]
+        def prep(i: int):
+            # each pool thread letterboxes on its own canvas, writes its slot of x
+            im, size = self._load(images[i])
+            return self._preprocess(im, self._canvas(), x[i], size)
+
+        # decode/resize release the GIL, so letterbox the batch in parallel
+        metas = list(_preprocess_pool().map(prep, range(len(images))))
+        out = bufs.run_batch(self.sess, x)
+        return [self._postprocess(out[i], *meta) for i, meta in enumerate(metas)]
+
+    def _postprocess(self, out: np.ndarray, scale, pad_x, pad_y, orig_w, orig_h) -> List[Detection]:
+        # drop only the batch axis: a full squeeze would turn a one-row
+        # end2end output (1,1,6) into a 1-D array
+        pred = out[0] if out.ndim == 3 else out
+
+        if pred.ndim == 2 and pred.shape[1] == 6:
+            # exported with NMS in the graph (`yolo export format=onnx nms=True`):
+            # ORT already ran NMS in C++, rows are final x1,y1,x2,y2,score,cls
+            boxes, cls_conf, cls_id = self._decode_end2end(pred)
+        else:
+            boxes, cls_conf, cls_id = self._decode_raw(pred)
+
+        if boxes.shape[0] == 0:
+            return []
 
         # de-letterbox
         boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / scale
@@ -142,15 +455,66 @@ class YOLOOnnxDetector:
         boxes[:, 1] = np.clip(boxes[:, 1], 0, orig_h)
         boxes[:, 3] = np.clip(boxes[:, 3], 0, orig_h)
 
-        dets: List[Detection] = []
-        for i in range(boxes.shape[0]):
-            cid = int(cls_id[i])
-            label = COCO_NAMES[cid] if cid < len(COCO_NAMES) else str(cid)
-            dets.append(
-                {
-                    "label": label,
-                    "confidence": float(cls_conf[i]),
-                    "bbox_xyxy": [float(v) for v in boxes[i].tolist()],
-                }
-            )
+        # columns -> python lists in bulk; much cheaper than per-element float()
+        n_names = len(COCO_NAMES)
+        dets: List[Detection] = [
+            {
+                "label": COCO_NAMES[cid] if cid < n_names else str(cid),
+                "confidence": score,
+                "bbox_xyxy": box,
+            }
+            for box, score, cid in zip(boxes.tolist(), cls_conf.tolist(), cls_id.tolist())
+        ]
         return dets
+
+    def _decode_end2end(self, pred: np.ndarray):
+        """(K,6) NMS'd rows -> boxes, conf, cls (letterbox space), thresholded."""
+        pred = pred[pred[:, 4] >= self.conf]  # also drops the zero padding rows
+        cls_id = pred[:, 5].astype(np.int64)
+        if self._class_id_arr is not None:
+            allowed = np.isin(cls_id, self._class_id_arr)
+            pred, cls_id = pred[allowed], cls_id[allowed]
+        return pred[:, 0:4].copy(), pred[:, 4].copy(), cls_id
+
+    def _decode_raw(self, pred: np.ndarray):
+        """Raw (84,N)/(N,84) head output -> boxes, conf, cls after threshold + NMS."""
+        # Handle common YOLOv8 ONNX layouts
+        if pred.shape[0] in (84, 85):
+            pred = pred.T
+
+        xywh = pred[:, 0:4]
+        cls_scores = pred[:, 4:]  # 80
+
+        # threshold on the per-row max first; argmax only runs on the survivors
+        max_scores = cls_scores.max(axis=1)
+        mask = max_scores >= self.conf
+        if not mask.any():
+            return _NO_BOXES  # background-only frame: skip the gathers and argmax
+        xywh = xywh[mask]
+        cls_conf = max_scores[mask]
+        cls_id = cls_scores[mask].argmax(axis=1)
+
+        # drop classes outside the allow-list before NMS (fewer candidates)
+        if self._class_id_arr is not None:
+            allowed = np.isin(cls_id, self._class_id_arr)
+            xywh, cls_conf, cls_id = xywh[allowed], cls_conf[allowed], cls_id[allowed]
+
+        if xywh.shape[0] == 0:
+            return _NO_BOXES
+
+        # xywh -> xyxy in place; the boolean-mask gathers above already made
+        # xywh a private copy, so this never touches the session output
+        boxes = xywh
+        boxes[:, :2] -= boxes[:, 2:] * 0.5
+        boxes[:, 2:] += boxes[:, :2]
+
+        # class-aware NMS in one pass: shift each class into its own disjoint
+        # coordinate range so boxes of different classes never overlap
+        # (same trick as torchvision's batched_nms); a lone class needs no offset
+        if cls_id.min() == cls_id.max():
+            boxes_off = boxes
+        else:
+            span = boxes.max() - boxes.min() + 1
+            boxes_off = boxes + (cls_id * span)[:, None]
+        keep = self._nms(boxes_off, cls_conf, self.iou)
+        return boxes[keep], cls_conf[keep], cls_id[keep]
@@ -1,9 +1,11 @@
 import os
 import uuid
-import json
+import orjson
+import aiofiles
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
 
 from .db import engine, get_db
 from .models import Photo, Run, Step, Base
@@ -33,6 +35,7 @@ app.add_middleware(
 
 
 UPLOAD_DIR = "/app/uploads"
+UPLOAD_CHUNK_SIZE = 1 << 20
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 from sqlalchemy.exc import OperationalError
@@ -44,6 +47,11 @@ def startup_db():
     for _ in range(30):
         try:
             Base.metadata.create_all(bind=engine)
+            # create_all skips tables that already exist, so add any indexes
+            # declared since then (e.g. runs.photo_id) to older databases
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
             return
         except OperationalError:
             time.sleep(1)
@@ -52,7 +60,7 @@ def startup_db():
 
 def step_to_out(step: Step) -> StepOut:
     try:
-        details = json.loads(step.details_json or "{}")
+        details = orjson.loads(step.details_json or "{}")
     except Exception:
         details = {"raw": step.details_json}
     return StepOut(
@@ -63,6 +71,16 @@ def step_to_out(step: Step) -> StepOut:
         updated_at=step.updated_at,
     )
 
+def run_to_out(run: Run) -> RunOut:
+    # run.steps is ordered by Step.id (see models.Run.steps)
+    return RunOut(
+        id=run.id,
+        photo_id=run.photo_id,
+        status=run.status,
+        created_at=run.created_at,
+        steps=[step_to_out(s) for s in run.steps],
+    )
+
 @app.get("/")
 def read_root():
     return {"message": "Asset Identification API is running ??"}
@@ -74,9 +92,10 @@ async def upload_photo(file: UploadFile = File(...), db: Session = Depends(get_d
     stored_path = os.path.join("uploads", stored_name)  # stored relative to /app
     abs_path = os.path.join(UPLOAD_DIR, stored_name)
 
-    contents = await file.read()
-    with open(abs_path, "wb") as f:
-        f.write(contents)
+    # stream to disk in 1 MiB chunks instead of buffering the whole upload in RAM
+    async with aiofiles.open(abs_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
 
     photo = Photo(
         filename=file.filename,
@@ -84,8 +103,9 @@ async def upload_photo(file: UploadFile = File(...), db: Session = Depends(get_d
         stored_path=stored_path,
     )
     db.add(photo)
-    db.commit()
-    db.refresh(photo)
+    # blocking DB round-trips; keep them off the event loop
+    await run_in_threadpool(db.commit)
+    await run_in_threadpool(db.refresh, photo)
     return photo
 
 @app.get("/photos", response_model=list[PhotoOut])
@@ -116,21 +136,22 @@ def start_run(photo_id: int, db: Session = Depends(get_db)):
     photo_id=photo_id,
     status="queued",
     detector_name="yolo_onnx",
-    detector_params_json=json.dumps({
+    detector_params_json=orjson.dumps({
         "conf": float(os.getenv("YOLO_CONF", "0.25")),
         "iou": float(os.getenv("YOLO_IOU", "0.45")),
         "input_size": 640
-    }),
+    }).decode(),
 )
 
     db.add(run)
     db.commit()
     db.refresh(run)
 
-    # Create step records
-    for name in PIPELINE_STEPS:
-        step = Step(run_id=run.id, name=name, status="pending", details_json="{}")
-        db.add(step)
+    # Create step records (one insert batch, one commit)
+    db.add_all([
+        Step(run_id=run.id, name=name, status="pending", details_json="{}")
+        for name in PIPELINE_STEPS
+    ])
     db.commit()
 
     # Enqueue async pipeline
@@ -194,7 +215,7 @@ def submit_feedback(
         raise HTTPException(status_code=404, detail="Summary step not found")
 
     try:
-        details = json.loads(summary_step.details_json or "{}")
+        details = orjson.loads(summary_step.details_json or "{}")
     except Exception:
         details = {}
 
@@ -204,39 +225,26 @@ def submit_feedback(
         "notes": payload.get("notes", ""),
     }
 
-    summary_step.details_json = json.dumps(details)
+    summary_step.details_json = orjson.dumps(details).decode()
     db.commit()
 
     return JSONResponse({"ok": True})
 @app.get("/photos/{photo_id}/runs", response_model=list[RunOut])
 def list_runs_for_photo(photo_id: int, db: Session = Depends(get_db)):
-    runs = db.query(Run).filter(Run.photo_id == photo_id).order_by(Run.id.desc()).all()
-    out = []
-    for run in runs:
-        steps = db.query(Step).filter(Step.run_id == run.id).order_by(Step.id.asc()).all()
-        out.append(RunOut(
-            id=run.id,
-            photo_id=run.photo_id,
-            status=run.status,
-            created_at=run.created_at,
-            steps=[step_to_out(s) for s in steps],
-        ))
-    return out
+    # steps for all runs come back in one IN (...) query instead of one per run
+    runs = (
+        db.query(Run)
+        .options(selectinload(Run.steps))
+        .filter(Run.photo_id == photo_id)
+        .order_by(Run.id.desc())
+        .all()
+    )
+    return [run_to_out(run) for run in runs]
 
 @app.get("/runs", response_model=list[RunOut])
 def list_runs(db: Session = Depends(get_db), limit: int = 25):
-    runs = db.query(Run).order_by(Run.id.desc()).limit(limit).all()
-    out = []
-    for run in runs:
-        steps = db.query(Step).filter(Step.run_id == run.id).order_by(Step.id.asc()).all()
-        out.append(RunOut(
-            id=run.id,
-            photo_id=run.photo_id,
-            status=run.status,
-            created_at=run.created_at,
-            steps=[step_to_out(s) for s in steps],
-        ))
-    return out
+    runs = db.query(Run).options(selectinload(Run.steps)).order_by(Run.id.desc()).limit(limit).all()
+    return [run_to_out(run) for run in runs]
 
 @app.get("/runs/{run_id}/overlay")
 def get_overlay(run_id: int, detector: str = "yolo_onnx"):
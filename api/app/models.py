@@ -23,7 +23,7 @@ class Run(Base):
     __tablename__ = "runs"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    photo_id: Mapped[int] = mapped_column(ForeignKey("photos.id", ondelete="CASCADE"), nullable=False)
+    photo_id: Mapped[int] = mapped_column(ForeignKey("photos.id", ondelete="CASCADE"), nullable=False, index=True)
 
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="queued")  # queued/running/done/failed
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -33,13 +33,17 @@ class Run(Base):
     detector_params_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
 
     photo: Mapped["Photo"] = relationship(back_populates="runs")
-    steps: Mapped[list["Step"]] = relationship(back_populates="run", cascade="all, delete-orphan")
+    steps: Mapped[list["Step"]] = relationship(
+        back_populates="run", cascade="all, delete-orphan", order_by="Step.id"
+    )
 
 
 class Step(Base):
     __tablename__ = "steps"
     __table_args__ = (
-        # Optional but recommended: one step name per run
+        # Optional but recommended: one step name per run.
+        # Postgres backs this with a unique (run_id, name) index, which is what
+        # _set_step / the feedback lookup filter on -- no separate index needed.
         UniqueConstraint("run_id", "name", name="uq_steps_run_id_name"),
     )
 
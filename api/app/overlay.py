@@ -1,7 +1,11 @@
 import os
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 
+from .detectors.base import load_rgb
 
+
+@lru_cache(maxsize=None)  # sizes are clamped to 14..34, so this stays tiny
 def _load_font(size: int) -> ImageFont.ImageFont:
     path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
 
@@ -11,14 +15,24 @@ def _load_font(size: int) -> ImageFont.ImageFont:
     return ImageFont.truetype(path, size)
 
 
+@lru_cache(maxsize=512)
+def _text_size(text: str, font_size: int) -> tuple[int, int]:
+    # labels repeat a lot ("person 0.87"...), so measure each string once
+    bbox = _load_font(font_size).getbbox(text)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
 def _clamp(v: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, v))
 
 
-def render_overlay(image_path: str, detections: list[dict], out_path: str):
+def render_overlay(image: Image.Image | str, detections: list[dict], out_path: str):
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
 
-    img = Image.open(image_path).convert("RGB")
+    img = load_rgb(image)
+    if img is image:
+        # callers reuse the decoded image across detectors: don't draw on theirs
+        img = img.copy()
     draw = ImageDraw.Draw(img)
 
     # --- sane, "normal" sizing ---
@@ -48,8 +62,7 @@ def render_overlay(image_path: str, detections: list[dict], out_path: str):
         text = f"{label} {conf:.2f}"
 
         # measure
-        bbox = draw.textbbox((0, 0), text, font=font)
-        tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        tw, th = _text_size(text, font_size)
 
         # place above top-left; if not enough room, place below
         tx1 = int(x1)
@@ -74,5 +87,5 @@ def render_overlay(image_path: str, detections: list[dict], out_path: str):
         draw.rectangle([tx1, ty1, tx2, ty2], fill=label_bg)
         draw.text((tx1 + pad, ty1 + pad), text, fill=label_fg, font=font)
 
-    img.save(out_path, quality=92)
+    img.save(out_path, format="JPEG", quality=85, optimize=True, progressive=True)
     return out_path
\ No newline at end of file
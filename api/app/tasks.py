@@ -1,4 +1,4 @@
-import json
+import orjson
 import os
 import time
 import exifread
@@ -8,6 +8,7 @@ from .db import SessionLocal
 from .models import Run, Step, Photo
 
 from .detectors import get_detector
+from .detectors.base import load_rgb
 from .overlay import render_overlay
 from .pipeline import PIPELINE_STEPS
 
@@ -19,17 +20,20 @@ def _enabled_detectors() -> list[str]:
     raw = os.getenv("DETECTORS", "yolo_onnx")
     return [x.strip() for x in raw.split(",") if x.strip()]
 
+# _set_step / _set_run_status only flush; run_pipeline commits at a few sync
+# points (before/after the slow detection step, and at the end) so a run costs
+# ~3 commits (fsyncs) instead of one per status change.
 def _set_step(db: Session, run_id: int, step_name: str, status: str, details: dict | None = None):
     step = db.query(Step).filter(Step.run_id == run_id, Step.name == step_name).one()
     step.status = status
     if details is not None:
-        step.details_json = json.dumps(details)
-    db.commit()
+        step.details_json = orjson.dumps(details).decode()
+    db.flush()
 
 def _set_run_status(db: Session, run_id: int, status: str):
     run = db.query(Run).filter(Run.id == run_id).one()
     run.status = status
-    db.commit()
+    db.flush()
 
 def _get_photo_path(db: Session, run_id: int) -> str:
     run = db.query(Run).filter(Run.id == run_id).one()
@@ -84,7 +88,7 @@ def _fake_summary(exif: dict, gate: dict, det: dict, cond: dict) -> dict:
 
 from .worker import celery_app
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, ignore_result=True)
 def run_pipeline(self, run_id: int):
     db = _db()
     try:
@@ -92,24 +96,22 @@ def run_pipeline(self, run_id: int):
 
         # Step 1: ingest
         _set_step(db, run_id, "ingest", "running", {"message": "verifying file exists"})
-        time.sleep(0.5)
         photo_path = _get_photo_path(db, run_id)
         exists = os.path.exists(photo_path)
         if not exists:
             _set_step(db, run_id, "ingest", "failed", {"error": f"file not found: {photo_path}"})
             _set_run_status(db, run_id, "failed")
+            db.commit()
             return
         _set_step(db, run_id, "ingest", "complete", {"path": photo_path})
 
         # Step 2: EXIF
         _set_step(db, run_id, "extract_exif", "running", {"message": "extracting EXIF"})
-        time.sleep(0.5)
         exif = _extract_exif(photo_path)
         _set_step(db, run_id, "extract_exif", "complete", {"exif": exif})
 
         # Step 3: utility gate
         _set_step(db, run_id, "utility_gate", "running", {"message": "running utility classifier (stub)"})
-        time.sleep(0.8)
         gate = _fake_utility_gate()
         _set_step(db, run_id, "utility_gate", "complete", gate)
 
@@ -122,24 +124,37 @@ def run_pipeline(self, run_id: int):
             "running",
             {"message": f"running detectors: {', '.join(enabled)}"},
         )
+        db.commit()  # publish progress so far before the slow part
 
         detectors_out: dict[str, dict] = {}
         base_dir_rel = f"uploads/overlays/run_{run_id}"
         base_dir_abs = os.path.join("/app", base_dir_rel)
         os.makedirs(base_dir_abs, exist_ok=True)
 
+        # decode once; every detector and overlay reuses the same image. An
+        # unreadable upload is reported per detector below and the run still
+        # finishes, same as when each detector opened the file itself.
+        decode_error: Exception | None = None
+        try:
+            img = load_rgb(photo_path)
+            img.load()
+        except Exception as e:
+            img, decode_error = None, e
+
         for det_name in enabled:
             started = time.time()
             try:
+                if decode_error is not None:
+                    raise decode_error
                 detector = get_detector(det_name)
 
                 # Run detection
-                detections = detector.detect(photo_path)
+                detections = detector.detect(img)
 
                 # Save overlay image (unique per detector)
                 overlay_rel = f"{base_dir_rel}/{det_name}.jpg"
                 overlay_abs = os.path.join("/app", overlay_rel)
-                render_overlay(photo_path, detections, overlay_abs)
+                render_overlay(img, detections, overlay_abs)
 
                 detectors_out[det_name] = {
                     "model": os.getenv("YOLO_MODEL", "yolov8n.pt") if det_name == "yolo_onnx" else det_name,
@@ -174,24 +189,26 @@ def run_pipeline(self, run_id: int):
                 "primary": "yolo_onnx" if "yolo_onnx" in detectors_out else (enabled[0] if enabled else None),
             },
         )
+        db.commit()
 
         # Step 5: condition
         _set_step(db, run_id, "condition_assessment", "running", {"message": "assessing condition (stub)"})
-        time.sleep(0.8)
         cond = _fake_condition_assessment()
         _set_step(db, run_id, "condition_assessment", "complete", cond)
 
         # Step 6: summary
         _set_step(db, run_id, "summary", "running", {"message": "building summary"})
-        time.sleep(0.3)
         summary = _fake_summary(exif=exif, gate=gate, det=det, cond=cond)
         _set_step(db, run_id, "summary", "complete", summary)
 
         _set_run_status(db, run_id, "done")
+        db.commit()
 
     except Exception as e:
         try:
+            db.rollback()  # drop the half-finished phase, keep what was committed
             _set_run_status(db, run_id, "failed")
+            db.commit()
         except Exception:
             pass
         raise e
@@ -1,8 +1,33 @@
+import logging
 import os
+
+# Each prefork pool process gets cpu_count // CELERY_CONC threads, for ORT (see
+# yolo_onnx._intra_op_threads) and for torch/OpenMP/MKL (GroundingDINO) alike,
+# so N processes x N threads never oversubscribe the host. Set before anything
+# imports numpy/torch, which read these once at import.
+CELERY_CONC = max(1, int(os.getenv("CELERY_CONC", "2")))
+_THREADS_PER_PROCESS = str(max(1, (os.cpu_count() or 1) // CELERY_CONC))
+os.environ.setdefault("OMP_NUM_THREADS", _THREADS_PER_PROCESS)
+os.environ.setdefault("MKL_NUM_THREADS", _THREADS_PER_PROCESS)
+
+import orjson
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_shutdown
+from kombu.serialization import register
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+log = logging.getLogger(__name__)
+
+# plain JSON on the wire, but encoded/decoded by orjson instead of stdlib json
+register(
+    "orjson",
+    orjson.dumps,
+    orjson.loads,
+    content_type="application/x-orjson",
+    content_encoding="utf-8",
+)
+
 celery_app = Celery(
     "asset_identification",
     broker=REDIS_URL,
@@ -12,7 +37,48 @@ celery_app = Celery(
 
 celery_app.conf.update(
     task_track_started=True,
-    task_serializer="json",
-    result_serializer="json",
-    accept_content=["json"],
+    task_serializer="orjson",
+    result_serializer="orjson",
+    accept_content=["orjson", "json"],
+    # run status lives in Postgres (runs/steps); nothing reads Celery results
+    task_ignore_result=True,
+    # the thread budget above assumes exactly this many pool processes
+    worker_concurrency=CELERY_CONC,
+    # tasks are long and CPU-bound: don't let one process hoard queued runs
+    worker_prefetch_multiplier=1,
+    # worker_process_init loads and warms every enabled detector before the child
+    # reports UP; the stock 4s would have the parent kill it mid-warm-up
+    worker_proc_alive_timeout=float(os.getenv("CELERY_PROC_ALIVE_TIMEOUT", "300")),
 )
+
+
+# YOLO_INFER_SERVER=1: one process owns the YOLO session and every pool process
+# feeds it through shared memory (app/detectors/infer_server.py). Started here,
+# in the main process, so the pool processes inherit its queues when they fork.
+@worker_init.connect
+def _start_infer_server(**_):
+    if os.getenv("YOLO_INFER_SERVER", "0") == "1":
+        from .detectors import infer_server
+        infer_server.start()
+
+
+# each pool process loads its models and runs one dummy inference right after
+# fork, instead of on whichever task it happens to receive first
+@worker_process_init.connect
+def _warm_up_detectors(**_):
+    from .detectors import get_detector
+    from .tasks import _enabled_detectors
+
+    for name in _enabled_detectors():
+        try:
+            get_detector(name).warm_up()
+        except Exception:
+            # the task reports a broken detector per run; don't kill the pool process
+            log.exception("warm-up failed for detector %s", name)
+
+
+@worker_shutdown.connect
+def _stop_infer_server(**_):
+    if os.getenv("YOLO_INFER_SERVER", "0") == "1":
+        from .detectors import infer_server
+        infer_server.stop()